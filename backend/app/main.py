@@ -1,7 +1,7 @@
 import os
 from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
 from .api_v0 import api_v0_router
+from .static_files import PrecompressedStaticFiles, mount_public
 from fastapi.middleware.cors import CORSMiddleware
 
 # APIとフロントエンドの統合アプリケーション
@@ -23,4 +23,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Next.js のビルド結果 (.next/static) を /_next/static で配信する
+# ファイル名にハッシュが含まれるので、すべて immutable としてキャッシュさせる
+NEXT_STATIC_DIR = os.path.join(os.path.dirname(__file__), "static", "static")
+if os.path.isdir(NEXT_STATIC_DIR):
+    app.mount(
+        "/_next/static",
+        PrecompressedStaticFiles(directory=NEXT_STATIC_DIR, immutable=True),
+        name="next-static",
+    )
 
+# frontend/public のファイル (ハッシュ無し) は ETag で再検証させる
+PUBLIC_DIR = os.path.join(os.path.dirname(__file__), "public")
+if os.path.isdir(PUBLIC_DIR):
+    mount_public(app, PUBLIC_DIR)
@@ -0,0 +1,66 @@
+import gzip
+import os
+import sys
+
+try:
+    import brotli
+except ImportError:  # brotli が無い環境では gzip のみ生成する
+    brotli = None
+
+# ビルド時に静的ファイルを gzip / brotli で事前圧縮する
+# 使い方: python -m app.precompress app/static
+
+# 圧縮の効果があるテキスト系のファイルのみ対象にする
+COMPRESSIBLE_EXTENSIONS = {
+    ".js", ".mjs", ".css", ".html", ".json", ".map",
+    ".svg", ".txt", ".xml", ".ico", ".webmanifest",
+}
+# これより小さいファイルは圧縮してもほとんど得をしない
+MIN_SIZE = 1024
+
+
+def write_variant(path: str, suffix: str, data: bytes, original_size: int) -> bool:
+    # 元のファイルより小さくならない場合は作らない
+    if len(data) >= original_size:
+        return False
+    with open(path + suffix, "wb") as f:
+        f.write(data)
+    stat = os.stat(path)
+    os.utime(path + suffix, (stat.st_atime, stat.st_mtime))
+    return True
+
+
+def precompress_file(path: str) -> int:
+    with open(path, "rb") as f:
+        data = f.read()
+    created = 0
+    # mtime=0 にして同じ入力からは常に同じ .gz が生成されるようにする
+    if write_variant(path, ".gz", gzip.compress(data, compresslevel=9, mtime=0), len(data)):
+        created += 1
+    if brotli is not None:
+        if write_variant(path, ".br", brotli.compress(data, quality=11), len(data)):
+            created += 1
+    return created
+
+
+def precompress_dir(directory: str) -> int:
+    created = 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            ext = os.path.splitext(name)[1].lower()
+            if ext not in COMPRESSIBLE_EXTENSIONS:
+                continue
+            path = os.path.join(root, name)
+            if os.path.getsize(path) < MIN_SIZE:
+                continue
+            created += precompress_file(path)
+    return created
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit("usage: python -m app.precompress <directory>...")
+    if brotli is None:
+        print("WARNING: brotli がインストールされていないため gzip のみ生成します")
+    for directory in sys.argv[1:]:
+        print(f"{directory}: {precompress_dir(directory)} files created")
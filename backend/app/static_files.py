@@ -0,0 +1,152 @@
+import os
+import mimetypes
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+# ビルド時に事前圧縮した静的ファイルを配信するための StaticFiles
+# (事前圧縮は app/precompress.py を参照)
+
+# 優先順に並べた (エンコーディング名, 拡張子)。q 値が同じ場合は先にあるものを選ぶ
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+VARIANT_SUFFIXES = tuple(suffix for _, suffix in ENCODINGS)
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# immutable でないファイルは毎回 ETag で再検証させる (変更がなければ 304)
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+
+def parse_accept_encoding(header: str) -> dict:
+    """Accept-Encoding ヘッダを {エンコーディング名: q値} に変換する"""
+    prefs = {}
+    for item in header.split(","):
+        name, *params = item.split(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params:
+            key, _, value = param.strip().partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        prefs[name] = q
+    return prefs
+
+
+def select_encoding(scope: Scope, available) -> str | None:
+    """available の中から q 値が最も高いエンコーディングを選ぶ (None は無圧縮)"""
+    header = Headers(scope=scope).get("accept-encoding")
+    if not header:
+        return None
+    prefs = parse_accept_encoding(header)
+    wildcard = prefs.get("*", 0.0)
+    # (q値, 優先度, 名前)。無圧縮は他に受け付けられるものが無い場合のみ使う
+    best = (prefs.get("identity", 0.0), 0, None)
+    for priority, (name, _) in enumerate(reversed(ENCODINGS), 1):
+        if name not in available:
+            continue
+        q = prefs.get(name, wildcard)
+        if q > 0 and (q, priority) > best[:2]:
+            best = (q, priority, name)
+    return best[2]
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """.br / .gz の事前圧縮ファイルがあればそちらを返す StaticFiles
+
+    immutable=True はディレクトリ内のファイル名がすべてハッシュ付きの場合に指定する
+    (Next.js の .next/static など)。それ以外は ETag で再検証させる。
+    """
+
+    def __init__(self, *args, immutable: bool = False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.immutable = immutable
+        # {元ファイルのパス: {エンコーディング名: (圧縮版のパス, stat)}}
+        # ファイルはイメージのビルド後に変わらないので、一度調べた結果を使い回す
+        self.variants = {}
+
+    def lookup_path(self, path: str) -> tuple[str, os.stat_result | None]:
+        # 圧縮版そのものは Content-Encoding 無しで返すと壊れるので直接は配信しない
+        # (元のファイルが無い data.tar.gz などは通常のファイルとして配信する)
+        for suffix in VARIANT_SUFFIXES:
+            if path.endswith(suffix) and super().lookup_path(path[: -len(suffix)])[1] is not None:
+                return "", None
+        full_path, stat_result = super().lookup_path(path)
+        # lookup_path はスレッドで実行されるので、圧縮版の stat もここで行う
+        if stat_result is not None and full_path not in self.variants:
+            self.variants[full_path] = self.lookup_variants(full_path)
+        return full_path, stat_result
+
+    def lookup_variants(self, full_path: str) -> dict:
+        variants = {}
+        for name, suffix in ENCODINGS:
+            try:
+                variants[name] = (full_path + suffix, os.stat(full_path + suffix))
+            except OSError:
+                continue
+        return variants
+
+    def file_response(
+        self,
+        full_path,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        full_path = os.fspath(full_path)
+        headers = {"cache-control": self.cache_control(full_path)}
+        media_type = mimetypes.guess_type(full_path)[0] or "text/plain"
+
+        path = full_path
+        variants = self.variants.get(full_path, {})
+        # 圧縮版が存在するファイルはクライアントによって中身が変わるので Vary を付ける
+        if variants:
+            headers["vary"] = "Accept-Encoding"
+        encoding = select_encoding(scope, variants)
+        if encoding is not None:
+            path, stat_result = variants[encoding]
+            headers["content-encoding"] = encoding
+
+        # granian のように http.response.pathsend に対応した ASGI サーバーでは
+        # ファイルの送信はサーバー側で行われ、Python のワーカーはパスを渡すだけになる
+        response = FileResponse(
+            path,
+            status_code=status_code,
+            headers=headers,
+            media_type=media_type,
+            stat_result=stat_result,
+        )
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
+
+    def cache_control(self, full_path: str) -> str:
+        if self.immutable:
+            return IMMUTABLE_CACHE_CONTROL
+        return REVALIDATE_CACHE_CONTROL
+
+
+def mount_public(app, directory: str) -> None:
+    """directory の直下のエントリごとに PrecompressedStaticFiles を登録する
+
+    / にまとめてマウントすると全てのパスにマッチしてしまい、
+    API の末尾スラッシュのリダイレクトや 405 が返らなくなるため
+    """
+    files = PrecompressedStaticFiles(directory=directory)
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if os.path.isdir(path):
+            app.mount("/" + name, PrecompressedStaticFiles(directory=path))
+        elif not name.endswith(VARIANT_SUFFIXES) or not os.path.exists(path.rsplit(".", 1)[0]):
+            app.add_route("/" + name, public_file_endpoint(files, name), methods=["GET", "HEAD"])
+
+
+def public_file_endpoint(files: PrecompressedStaticFiles, name: str):
+    async def endpoint(request):
+        return await files.get_response(name, request.scope)
+
+    return endpoint
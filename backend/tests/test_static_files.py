@@ -0,0 +1,149 @@
+import gzip
+
+import pytest
+from fastapi import APIRouter, FastAPI
+from starlette.applications import Starlette
+from starlette.routing import Mount
+from starlette.testclient import TestClient
+
+from app.precompress import brotli, precompress_dir
+from app.static_files import (
+    IMMUTABLE_CACHE_CONTROL,
+    REVALIDATE_CACHE_CONTROL,
+    PrecompressedStaticFiles,
+    mount_public,
+)
+
+BODY = b"console.log('hello');\n" * 100
+
+
+@pytest.fixture
+def static_dir(tmp_path):
+    (tmp_path / "data.tar.gz").write_bytes(gzip.compress(BODY))
+    (tmp_path / "app.js").write_bytes(BODY)
+    (tmp_path / "app.js.gz").write_bytes(gzip.compress(BODY))
+    # brotli がインストールされていると httpx が展開しようとするので本物を書く
+    (tmp_path / "app.js.br").write_bytes(brotli.compress(BODY) if brotli else b"brotli")
+    (tmp_path / "plain.js").write_bytes(BODY)
+    return tmp_path
+
+
+@pytest.fixture
+def client(static_dir):
+    app = Starlette(routes=[Mount("/", PrecompressedStaticFiles(directory=static_dir))])
+    return TestClient(app)
+
+
+def get(client, path, accept_encoding):
+    # TestClient (httpx) が自動で付ける Accept-Encoding を上書きする
+    return client.get(path, headers={"Accept-Encoding": accept_encoding})
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, expected",
+    [
+        ("gzip, deflate, br", "br"),
+        ("gzip", "gzip"),
+        ("gzip;q=1, br;q=0.1", "gzip"),
+        ("br;q=0, gzip", "gzip"),
+        ("*", "br"),
+        ("br;q=0, *;q=0.5", "gzip"),
+        ("identity", None),
+        ("", None),
+    ],
+)
+def test_selects_encoding(client, accept_encoding, expected):
+    response = get(client, "/app.js", accept_encoding)
+    assert response.status_code == 200
+    assert response.headers.get("content-encoding") == expected
+    assert response.headers["vary"] == "Accept-Encoding"
+    if expected is None:
+        assert response.content == BODY
+
+
+def test_gzip_body_is_decoded(client):
+    response = get(client, "/app.js", "gzip")
+    assert response.content == BODY
+    assert response.headers["content-type"].startswith("text/javascript")
+
+
+def test_not_modified_keeps_vary(client):
+    etag = get(client, "/app.js", "gzip").headers["etag"]
+    response = client.get("/app.js", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.headers["cache-control"] == REVALIDATE_CACHE_CONTROL
+
+
+def test_variant_etag_differs_from_identity(client):
+    gzip_etag = get(client, "/app.js", "gzip").headers["etag"]
+    response = client.get("/app.js", headers={"Accept-Encoding": "identity", "If-None-Match": gzip_etag})
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize("path", ["/app.js.gz", "/app.js.br"])
+def test_variants_are_not_served_directly(client, path):
+    assert get(client, path, "gzip, br").status_code == 404
+
+
+def test_archive_without_base_file_is_served(client):
+    response = get(client, "/data.tar.gz", "identity")
+    assert response.status_code == 200
+    assert response.content == gzip.compress(BODY)
+    assert "content-encoding" not in response.headers
+
+
+def test_no_vary_without_variants(client):
+    response = get(client, "/plain.js", "gzip, br")
+    assert "content-encoding" not in response.headers
+    assert "vary" not in response.headers
+
+
+def test_cache_control(static_dir, client):
+    # ファイル名にハッシュらしきものがあっても immutable を指定しない限り再検証させる
+    (static_dir / "logo-20240101.js").write_bytes(BODY)
+    assert get(client, "/logo-20240101.js", "gzip").headers["cache-control"] == REVALIDATE_CACHE_CONTROL
+
+    app = Starlette(routes=[Mount("/", PrecompressedStaticFiles(directory=static_dir, immutable=True))])
+    response = get(TestClient(app), "/plain.js", "gzip")
+    assert response.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+
+
+def test_mount_public_keeps_api_fallbacks(static_dir):
+    (static_dir / "icons").mkdir()
+    (static_dir / "icons" / "logo.svg").write_bytes(b"<svg/>")
+    router = APIRouter(prefix="/api/v0")
+
+    @router.get("/polls")
+    async def polls():
+        return {}
+
+    @router.post("/auth/login")
+    async def login():
+        return {}
+
+    app = FastAPI()
+    app.include_router(router)
+    mount_public(app, str(static_dir))
+    client = TestClient(app)
+
+    assert get(client, "/app.js", "gzip").headers["content-encoding"] == "gzip"
+    assert client.get("/icons/logo.svg").content == b"<svg/>"
+    assert client.get("/app.js.gz").status_code == 404
+    assert client.get("/data.tar.gz").status_code == 200
+    response = client.get("/api/v0/polls/", follow_redirects=False)
+    assert response.status_code == 307
+    assert response.headers["location"].endswith("/api/v0/polls")
+    assert client.get("/api/v0/auth/login").status_code == 405
+    assert client.post("/unknown").status_code == 404
+    assert client.post("/app.js").status_code == 405
+
+
+def test_precompress_dir(tmp_path):
+    (tmp_path / "big.js").write_bytes(BODY)
+    (tmp_path / "small.js").write_bytes(b"x")
+    (tmp_path / "image.png").write_bytes(BODY)
+    precompress_dir(str(tmp_path))
+    assert gzip.decompress((tmp_path / "big.js.gz").read_bytes()) == BODY
+    assert not (tmp_path / "small.js.gz").exists()
+    assert not (tmp_path / "image.png.gz").exists()